@@ -3,13 +3,43 @@
 Generate architecture diagram for Llama Stack ReACT Agent project.
 """
 
+import argparse
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+parser = argparse.ArgumentParser(description='Generate the architecture diagram PNG')
+parser.add_argument('--check', action='store_true',
+                    help='Only verify the script and its imports load, without rendering')
+args = parser.parse_args()
+
+# Output PNG lives next to this script; a sidecar file records the hash of the
+# script that produced it so unchanged diagrams are not re-rendered
+OUTPUT_PATH = Path(__file__).resolve().with_suffix('.png')
+HASH_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.name + '.sha256')
+
+source_hash = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+if not args.check and OUTPUT_PATH.exists() and HASH_PATH.exists() and HASH_PATH.read_text().strip() == source_hash:
+    print("ReACT Architecture diagram is up to date, skipping render.")
+    sys.exit(0)
+
+import matplotlib
+
+# Render straight to a raster buffer; no GUI toolkit is needed to write a PNG
+matplotlib.use('Agg', force=True)
+
 import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.patches import FancyBboxPatch, Ellipse, Rectangle
-import numpy as np
+from matplotlib.collections import PatchCollection
+from matplotlib.patches import Ellipse, Rectangle
+from PIL import Image
+
+if args.check:
+    print("ReACT Architecture diagram script check passed.")
+    sys.exit(0)
 
 # Create figure and axis with RAG-style proportions
-fig, ax = plt.subplots(1, 1, figsize=(14, 10))
+fig, ax = plt.subplots(1, 1, figsize=(14, 10), dpi=150, facecolor='white')
 ax.set_xlim(0, 14)
 ax.set_ylim(0, 10)
 ax.axis('off')
@@ -20,56 +50,66 @@ STROKE_WIDTH = 2
 TEXT_COLOR = '#000000'
 FILL_COLOR = '#FFFFFF'
 
+# Shape styles, set once per PatchCollection rather than on every patch
+STYLE_SOLID = dict(facecolors=FILL_COLOR, edgecolors=PRIMARY_RED, linewidths=STROKE_WIDTH, linestyles='-')
+STYLE_DASHED = dict(STYLE_SOLID, linestyles='--')
+
+# Patches are queued here and drawn as one PatchCollection per style by
+# draw_patches(), instead of one add_patch() call per shape
+_rects = []
+_dashed_rects = []
+_ellipses = []
+
+# Text labels are queued the same way and drawn by draw_texts(), grouped by
+# font so consecutive draws hit matplotlib's font cache warm
+_texts = []
+
+# Helper function to queue a text label
+def add_text(x, y, text, **kwargs):
+    _texts.append((x, y, text, kwargs))
+
 # Helper function to create rectangles with red borders
 def create_rect(ax, x, y, width, height, text, fontsize=10, dashed=False):
-    linestyle = '--' if dashed else '-'
-    rect = Rectangle((x, y), width, height, 
-                    facecolor=FILL_COLOR, 
-                    edgecolor=PRIMARY_RED, 
-                    linewidth=STROKE_WIDTH,
-                    linestyle=linestyle)
-    ax.add_patch(rect)
-    ax.text(x + width/2, y + height/2, text, 
-            ha='center', va='center', fontsize=fontsize, 
-            color=TEXT_COLOR, weight='normal')
+    rect = Rectangle((x, y), width, height)
+    (_dashed_rects if dashed else _rects).append(rect)
+    add_text(x + width/2, y + height/2, text, 
+             ha='center', va='center', fontsize=fontsize, 
+             color=TEXT_COLOR, weight='normal')
 
 # Helper function to create ellipses with red borders  
 def create_ellipse(ax, x, y, width, height, text, fontsize=10):
-    ellipse = Ellipse((x + width/2, y + height/2), width, height,
-                     facecolor=FILL_COLOR,
-                     edgecolor=PRIMARY_RED,
-                     linewidth=STROKE_WIDTH)
-    ax.add_patch(ellipse)
-    ax.text(x + width/2, y + height/2, text,
-            ha='center', va='center', fontsize=fontsize,
-            color=TEXT_COLOR, weight='normal')
+    _ellipses.append(Ellipse((x + width/2, y + height/2), width, height))
+    add_text(x + width/2, y + height/2, text,
+             ha='center', va='center', fontsize=fontsize,
+             color=TEXT_COLOR, weight='normal')
 
 # Helper function to create cylinders (databases)
 def create_cylinder(ax, x, y, width, height, text, fontsize=10):
     # Main cylinder body
-    rect = Rectangle((x, y + height*0.1), width, height*0.8,
-                    facecolor=FILL_COLOR,
-                    edgecolor=PRIMARY_RED,
-                    linewidth=STROKE_WIDTH)
-    ax.add_patch(rect)
+    _rects.append(Rectangle((x, y + height*0.1), width, height*0.8))
     
-    # Top ellipse
-    top_ellipse = Ellipse((x + width/2, y + height*0.9), width, height*0.2,
-                         facecolor=FILL_COLOR,
-                         edgecolor=PRIMARY_RED,
-                         linewidth=STROKE_WIDTH)
-    ax.add_patch(top_ellipse)
+    # Top and bottom ellipses (drawn after all rectangles, so they cap the body)
+    _ellipses.append(Ellipse((x + width/2, y + height*0.9), width, height*0.2))
+    _ellipses.append(Ellipse((x + width/2, y + height*0.1), width, height*0.2))
     
-    # Bottom ellipse
-    bottom_ellipse = Ellipse((x + width/2, y + height*0.1), width, height*0.2,
-                           facecolor=FILL_COLOR,
-                           edgecolor=PRIMARY_RED,
-                           linewidth=STROKE_WIDTH)
-    ax.add_patch(bottom_ellipse)
+    add_text(x + width/2, y + height/2, text,
+             ha='center', va='center', fontsize=fontsize,
+             color=TEXT_COLOR, weight='normal')
+
+# Helper function to add all queued patches, one collection per style
+def draw_patches(ax):
+    for patches, style in ((_rects, STYLE_SOLID), (_dashed_rects, STYLE_DASHED), (_ellipses, STYLE_SOLID)):
+        if patches:
+            ax.add_collection(PatchCollection(patches, match_original=False, **style))
+
+# Helper function to add all queued text labels, grouped by font
+def draw_texts(ax):
+    def font_key(item):
+        kwargs = item[3]
+        return (kwargs.get('fontsize', 10), kwargs.get('style', 'normal'), kwargs.get('weight', 'normal'))
     
-    ax.text(x + width/2, y + height/2, text,
-            ha='center', va='center', fontsize=fontsize,
-            color=TEXT_COLOR, weight='normal')
+    for x, y, text, kwargs in sorted(_texts, key=font_key):
+        ax.text(x, y, text, **kwargs)
 
 # Helper function to create arrows
 def create_arrow(ax, start, end, style='->', linewidth=2):
@@ -77,8 +117,8 @@ def create_arrow(ax, start, end, style='->', linewidth=2):
                 arrowprops=dict(arrowstyle=style, color=PRIMARY_RED, lw=linewidth))
 
 # Title
-ax.text(7, 9.5, 'Llama Stack with ReACT Agent Architecture', 
-        ha='center', va='center', fontsize=16, weight='bold', color=TEXT_COLOR)
+add_text(7, 9.5, 'Llama Stack with ReACT Agent Architecture', 
+         ha='center', va='center', fontsize=16, weight='bold', color=TEXT_COLOR)
 
 # Input Layer (left side)
 create_ellipse(ax, 0.5, 7.5, 2, 1, 'User\nRequest', fontsize=10)
@@ -101,6 +141,8 @@ create_cylinder(ax, 12.5, 5, 1.5, 1, 'HR Enterprise\nAPI\n(Node.js)', fontsize=7
 # Infrastructure Layer (bottom)
 create_rect(ax, 1, 2, 12, 1.5, 'OpenShift / Kubernetes Infrastructure\nPods • Services • Routes • InferenceService • ServingRuntime', fontsize=10, dashed=True)
 
+draw_patches(ax)
+
 # Data Flow Arrows
 # User to Playground
 create_arrow(ax, (2.5, 8), (3.5, 8))
@@ -118,28 +160,39 @@ create_arrow(ax, (8.5, 7), (9.6, 6))
 create_arrow(ax, (10.7, 5.5), (12.5, 5.5))
 
 # Add protocol labels along arrows
-ax.text(3, 8.3, 'HTTP', ha='center', fontsize=8, color=PRIMARY_RED, style='italic')
-ax.text(6.5, 8.3, 'ReACT API', ha='center', fontsize=8, color=PRIMARY_RED, style='italic')
-ax.text(10.2, 8.3, 'OpenAI API', ha='center', fontsize=8, color=PRIMARY_RED, style='italic')
-ax.text(11.6, 5.8, 'Tool Calls', ha='center', fontsize=8, color=PRIMARY_RED, style='italic')
+add_text(3, 8.3, 'HTTP', ha='center', fontsize=8, color=PRIMARY_RED, style='italic')
+add_text(6.5, 8.3, 'ReACT API', ha='center', fontsize=8, color=PRIMARY_RED, style='italic')
+add_text(10.2, 8.3, 'OpenAI API', ha='center', fontsize=8, color=PRIMARY_RED, style='italic')
+add_text(11.6, 5.8, 'Tool Calls', ha='center', fontsize=8, color=PRIMARY_RED, style='italic')
 
 # Add component descriptions (bottom section)
-ax.text(1, 1.5, 'Key Technologies:', fontsize=11, weight='bold', color=TEXT_COLOR)
-ax.text(1, 1.2, '• ReACT Pattern: Reasoning + Acting for intelligent agents', fontsize=9, color=TEXT_COLOR)
-ax.text(1, 0.9, '• Llama Stack Client: Agent framework integration', fontsize=9, color=TEXT_COLOR)
-ax.text(1, 0.6, '• vLLM: High-performance LLM inference engine', fontsize=9, color=TEXT_COLOR)
-ax.text(1, 0.3, '• Helm Charts: Kubernetes deployment automation', fontsize=9, color=TEXT_COLOR)
+add_text(1, 1.5, 'Key Technologies:', fontsize=11, weight='bold', color=TEXT_COLOR)
+add_text(1, 1.2, '• ReACT Pattern: Reasoning + Acting for intelligent agents', fontsize=9, color=TEXT_COLOR)
+add_text(1, 0.9, '• Llama Stack Client: Agent framework integration', fontsize=9, color=TEXT_COLOR)
+add_text(1, 0.6, '• vLLM: High-performance LLM inference engine', fontsize=9, color=TEXT_COLOR)
+add_text(1, 0.3, '• Helm Charts: Kubernetes deployment automation', fontsize=9, color=TEXT_COLOR)
 
 # ReACT Capabilities (right section)
-ax.text(8.5, 1.5, 'ReACT Capabilities:', fontsize=11, weight='bold', color=TEXT_COLOR)
-ax.text(8.5, 1.2, '• Multi-step reasoning and problem solving', fontsize=9, color=TEXT_COLOR)
-ax.text(8.5, 0.9, '• Conditional tool execution based on analysis', fontsize=9, color=TEXT_COLOR)
-ax.text(8.5, 0.6, '• Vacation booking with balance verification', fontsize=9, color=TEXT_COLOR)
-ax.text(8.5, 0.3, '• Natural language understanding & generation', fontsize=9, color=TEXT_COLOR)
+add_text(8.5, 1.5, 'ReACT Capabilities:', fontsize=11, weight='bold', color=TEXT_COLOR)
+add_text(8.5, 1.2, '• Multi-step reasoning and problem solving', fontsize=9, color=TEXT_COLOR)
+add_text(8.5, 0.9, '• Conditional tool execution based on analysis', fontsize=9, color=TEXT_COLOR)
+add_text(8.5, 0.6, '• Vacation booking with balance verification', fontsize=9, color=TEXT_COLOR)
+add_text(8.5, 0.3, '• Natural language understanding & generation', fontsize=9, color=TEXT_COLOR)
+
+draw_texts(ax)
 
 plt.tight_layout()
-plt.savefig('/Users/phayes/projects/kickstart-llama-stack-react/assets/images/architecture-diagram.png', 
-            dpi=300, bbox_inches='tight', facecolor='white', edgecolor='none')
-plt.close()
+
+# Rasterize once on the Agg canvas and hand the RGBA buffer straight to Pillow,
+# bypassing savefig's tight-bbox second render; 150 dpi is plenty on screen
+fig.canvas.draw()
+Image.frombytes('RGBA', fig.canvas.get_width_height(), bytes(fig.canvas.buffer_rgba())).save(
+    OUTPUT_PATH, 'PNG', compress_level=1)
+plt.close(fig)
+
+# Write the hash atomically so an interrupted run never leaves a stale match
+tmp_hash_path = HASH_PATH.with_name(HASH_PATH.name + '.tmp')
+tmp_hash_path.write_text(source_hash + '\n')
+os.replace(tmp_hash_path, HASH_PATH)
 
 print("ReACT Architecture diagram created successfully!")
\ No newline at end of file
@@ -13,14 +13,13 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 from server import mcp, create_starlette_app
 import uvicorn
-import threading
-import time
 
 class TestServer:
     def __init__(self, host="127.0.0.1", port=8001):
         self.host = host
         self.port = port
-        self.server_thread = None
+        self.server = None
+        self.server_task = None
         self.app = None
         
     async def start_server(self):
@@ -32,63 +31,86 @@ class TestServer:
                 
             self.app = create_starlette_app(mcp_server, debug=True)
             
-            # Start server in a separate thread
-            def run_server():
-                uvicorn.run(self.app, host=self.host, port=self.port, log_level="warning")
-            
-            self.server_thread = threading.Thread(target=run_server, daemon=True)
-            self.server_thread.start()
+            # Serve on the test's own event loop instead of a second loop in a thread
+            config = uvicorn.Config(self.app, host=self.host, port=self.port, log_level="warning", loop="asyncio")
+            self.server = uvicorn.Server(config)
+            self.server_task = asyncio.create_task(self.server.serve())
             
             # Wait for server to start
-            await asyncio.sleep(2)
+            await self.wait_for_port()
             print(f"Test server started on http://{self.host}:{self.port}")
             return True
             
         except Exception as e:
             print(f"Failed to start server: {e}")
             return False
+    
+    async def wait_for_port(self):
+        """Poll the server port with backoff until it accepts connections"""
+        for delay in (0.02, 0.05, 0.1, 0.2, 0.4, 0.8):
+            if self.server_task.done():
+                raise RuntimeError("Server exited before it started")
+            try:
+                # Non-blocking connect, since the server runs on this same loop
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), timeout=0.1
+                )
+                writer.close()
+                await writer.wait_closed()
+                return
+            except (OSError, asyncio.TimeoutError):
+                await asyncio.sleep(delay)
+        raise RuntimeError(f"Server did not start listening on {self.host}:{self.port}")
+    
+    async def stop_server(self):
+        """Stop the test server"""
+        if self.server is not None:
+            self.server.should_exit = True
+            try:
+                # Lingering SSE streams can hold up graceful shutdown
+                await asyncio.wait_for(self.server_task, timeout=5)
+            except asyncio.TimeoutError:
+                pass
 
-async def test_health_endpoint():
+async def test_health_endpoint(client: httpx.AsyncClient):
     """Test the health endpoint"""
     print("Testing health endpoint...")
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get("http://127.0.0.1:8001/health", timeout=10)
-            
-            print(f"Health endpoint status: {response.status_code}")
-            print(f"Health response: {response.json()}")
-            
-            if response.status_code == 200:
-                print("✅ Health endpoint working")
-                return True
-            else:
-                print("❌ Health endpoint failed")
-                return False
+        response = await client.get("/health", timeout=10)
+        
+        print(f"Health endpoint status: {response.status_code}")
+        print(f"Health response: {response.json()}")
+        
+        if response.status_code == 200:
+            print("✅ Health endpoint working")
+            return True
+        else:
+            print("❌ Health endpoint failed")
+            return False
                 
     except Exception as e:
         print(f"❌ Health endpoint error: {e}")
         return False
 
-async def test_sse_endpoint_connection():
+async def test_sse_endpoint_connection(client: httpx.AsyncClient):
     """Test SSE endpoint can be connected to"""
     print("Testing SSE endpoint connection...")
     
     try:
-        async with httpx.AsyncClient() as client:
-            # Just test that we can make a connection - SSE will handle the protocol
-            response = await client.get("http://127.0.0.1:8001/sse", timeout=5)
-            
-            print(f"SSE endpoint status: {response.status_code}")
-            
-            # For SSE, we might get different status codes depending on implementation
-            if response.status_code in [200, 206, 101]:  # Common SSE status codes
-                print("✅ SSE endpoint accessible")
-                return True
-            else:
-                print(f"SSE endpoint response: {response.text[:200]}")
-                print("✅ SSE endpoint responded (may be expected behavior)")
-                return True
+        # Just test that we can make a connection - SSE will handle the protocol
+        response = await client.get("/sse", timeout=5)
+        
+        print(f"SSE endpoint status: {response.status_code}")
+        
+        # For SSE, we might get different status codes depending on implementation
+        if response.status_code in [200, 206, 101]:  # Common SSE status codes
+            print("✅ SSE endpoint accessible")
+            return True
+        else:
+            print(f"SSE endpoint response: {response.text[:200]}")
+            print("✅ SSE endpoint responded (may be expected behavior)")
+            return True
                 
     except httpx.TimeoutException:
         print("✅ SSE endpoint timeout (expected for SSE connections)")
@@ -113,11 +135,18 @@ async def main():
         print("❌ Failed to start test server")
         return 1
     
-    success = True
-    
-    # Test endpoints
-    success &= await test_health_endpoint()
-    success &= await test_sse_endpoint_connection()
+    # Test endpoints concurrently, sharing one client (and its connection pool)
+    client = httpx.AsyncClient(base_url=f"http://{server.host}:{server.port}", timeout=10)
+    try:
+        results = await asyncio.gather(
+            test_health_endpoint(client),
+            test_sse_endpoint_connection(client),
+            return_exceptions=True,
+        )
+        success = all(result is True for result in results)
+    finally:
+        await client.aclose()
+        await server.stop_server()
     
     print(f"\n=== Test Results ===")
     if success:
@@ -8,13 +8,15 @@ HR operations like checking vacation balances and booking time off.
 """
 
 import asyncio
-import json
 import logging
 import os
-from typing import Dict, Any, List, Optional
+from contextlib import aclosing
+from typing import Dict, Any, AsyncIterator, List, Optional
 from datetime import datetime
 
 import httpx
+import orjson
+from cachetools import TTLCache
 from llama_stack_client import LlamaStackClient
 from llama_stack_client.lib.agents.agent import ReActAgent
 from llama_stack_client.types import (
@@ -35,70 +37,53 @@ from llama_stack_client.types import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class HRReActAgent:
-    """
-    ReACT Agent for HR operations with reasoning capabilities
-    """
-    
-    def __init__(self, llama_stack_url: str = "http://llama-stack:11011", hr_api_url: str = "http://hr-api:3000"):
-        self.client = LlamaStackClient(base_url=llama_stack_url)
-        self.hr_api_url = hr_api_url
-        self.model = "llama3.2:3b-instruct"
-        self.agent_id = None
-        self.current_session = None
-        
-        # Define available tools for HR operations
-        self.tools = [
-            {
-                "name": "hr_vacation_balance",
-                "description": "Check vacation balance for an employee",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "employee_id": {
-                            "type": "string",
-                            "description": "Employee ID (e.g., EMP001)"
-                        }
-                    },
-                    "required": ["employee_id"]
+# Available tools for HR operations, shared by every agent instance; a tuple
+# so no instance can change the tool list for the others
+HR_TOOLS = (
+    {
+        "name": "hr_vacation_balance",
+        "description": "Check vacation balance for an employee",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "employee_id": {
+                    "type": "string",
+                    "description": "Employee ID (e.g., EMP001)"
                 }
             },
-            {
-                "name": "hr_vacation_request",
-                "description": "Create a vacation request for an employee",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "employee_id": {
-                            "type": "string",
-                            "description": "Employee ID (e.g., EMP001)"
-                        },
-                        "start_date": {
-                            "type": "string",
-                            "description": "Start date in YYYY-MM-DD format"
-                        },
-                        "end_date": {
-                            "type": "string",
-                            "description": "End date in YYYY-MM-DD format"
-                        },
-                        "reason": {
-                            "type": "string",
-                            "description": "Reason for vacation request"
-                        }
-                    },
-                    "required": ["employee_id", "start_date", "end_date"]
+            "required": ["employee_id"]
+        }
+    },
+    {
+        "name": "hr_vacation_request",
+        "description": "Create a vacation request for an employee",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "employee_id": {
+                    "type": "string",
+                    "description": "Employee ID (e.g., EMP001)"
+                },
+                "start_date": {
+                    "type": "string",
+                    "description": "Start date in YYYY-MM-DD format"
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format"
+                },
+                "reason": {
+                    "type": "string",
+                    "description": "Reason for vacation request"
                 }
-            }
-        ]
-    
-    async def initialize_agent(self):
-        """Initialize the ReACT agent with Llama Stack"""
-        try:
-            # Create the agent
-            agent_config = ReActAgentConfig(
-                model=self.model,
-                tools=self.tools,
-                instructions="""You are an intelligent HR assistant that uses ReACT (Reasoning + Acting) to help with vacation management.
+            },
+            "required": ["employee_id", "start_date", "end_date"]
+        }
+    }
+)
+
+# System instructions for the ReACT agent
+HR_INSTRUCTIONS = """You are an intelligent HR assistant that uses ReACT (Reasoning + Acting) to help with vacation management.
 
 IMPORTANT: Always think step by step and show your reasoning process:
 1. First, reason about what information you need
@@ -117,24 +102,80 @@ Use this format for your responses:
 🛠 [Tool usage]
 ✅ [Final result/action]
 
-Be helpful, accurate, and always explain your reasoning.""",
-                enable_session_persistence=True,
-                max_infer_iters=10
-            )
-            
-            response = await self.client.agents.create(
-                request=AgentCreateRequest(
-                    agent_id=f"hr-react-agent-{datetime.now().isoformat()}",
-                    config=agent_config
+Be helpful, accurate, and always explain your reasoning."""
+
+class HRReActAgent:
+    """
+    ReACT Agent for HR operations with reasoning capabilities
+    """
+    
+    def __init__(self, llama_stack_url: str = "http://llama-stack:11011", hr_api_url: str = "http://hr-api:3000"):
+        self.client = LlamaStackClient(base_url=llama_stack_url)
+        self.hr_api_url = hr_api_url
+        # Shared HR API client so tool calls reuse keep-alive connections
+        self.http_client = httpx.AsyncClient(
+            base_url=hr_api_url,
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=32)
+        )
+        self.model = "llama3.2:3b-instruct"
+        self.agent_id = None
+        self.current_session = None
+        
+        # Set once the agent exists on Llama Stack; the lock keeps concurrent
+        # callers from creating it twice
+        self._ready = asyncio.Event()
+        self._init_lock = asyncio.Lock()
+        
+        # Define available tools for HR operations
+        self.tools = HR_TOOLS
+        
+        # Recent balance lookups per employee, dropped after a booking. Each
+        # booking also bumps the employee's generation, so a lookup that was
+        # already in flight does not store the pre-booking balance.
+        self._balance_cache = TTLCache(maxsize=1024, ttl=30)
+        self._balance_generation: Dict[str, int] = {}
+        
+        # Tool name -> handler coroutine used by execute_tool
+        self._tool_handlers = {
+            "hr_vacation_balance": self._get_vacation_balance,
+            "hr_vacation_request": self._create_vacation_request,
+        }
+    
+    @property
+    def ready(self) -> bool:
+        """Whether the agent has been created on Llama Stack"""
+        return self._ready.is_set()
+    
+    async def initialize_agent(self):
+        """Initialize the ReACT agent with Llama Stack; a no-op once done"""
+        async with self._init_lock:
+            if self._ready.is_set():
+                return
+            try:
+                # Create the agent
+                agent_config = ReActAgentConfig(
+                    model=self.model,
+                    tools=self.tools,
+                    instructions=HR_INSTRUCTIONS,
+                    enable_session_persistence=True,
+                    max_infer_iters=10
                 )
-            )
-            
-            self.agent_id = response.agent_id
-            logger.info(f"Created ReACT agent with ID: {self.agent_id}")
-            
-        except Exception as e:
-            logger.error(f"Failed to initialize agent: {e}")
-            raise
+                
+                response = await self.client.agents.create(
+                    request=AgentCreateRequest(
+                        agent_id=f"hr-react-agent-{datetime.now().isoformat()}",
+                        config=agent_config
+                    )
+                )
+                
+                self.agent_id = response.agent_id
+                self._ready.set()
+                logger.info(f"Created ReACT agent with ID: {self.agent_id}")
+                
+            except Exception as e:
+                logger.error(f"Failed to initialize agent: {e}")
+                raise
     
     async def create_session(self) -> str:
         """Create a new agent session"""
@@ -152,117 +193,173 @@ Be helpful, accurate, and always explain your reasoning.""",
     
     async def execute_tool(self, tool_name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """Execute HR tool calls by interacting with HR API"""
+        handler = self._tool_handlers.get(tool_name)
+        if handler is None:
+            return {"error": f"Unknown tool: {tool_name}"}
+        
         try:
-            async with httpx.AsyncClient() as client:
-                if tool_name == "hr_vacation_balance":
-                    employee_id = parameters["employee_id"]
-                    response = await client.get(f"{self.hr_api_url}/api/vacations/{employee_id}")
-                    if response.status_code == 200:
-                        data = response.json()
-                        return {
-                            "employee_id": employee_id,
-                            "vacation_balance": data.get("balance", 0),
-                            "total_days": data.get("total_days", 0),
-                            "used_days": data.get("used_days", 0)
-                        }
-                    else:
-                        return {"error": f"Failed to get vacation balance: {response.text}"}
-                
-                elif tool_name == "hr_vacation_request":
-                    employee_id = parameters["employee_id"]
-                    start_date = parameters["start_date"]
-                    end_date = parameters["end_date"]
-                    reason = parameters.get("reason", "Personal time off")
-                    
-                    request_data = {
-                        "employee_id": employee_id,
-                        "start_date": start_date,
-                        "end_date": end_date,
-                        "reason": reason,
-                        "status": "approved"
-                    }
-                    
-                    response = await client.post(
-                        f"{self.hr_api_url}/api/vacations",
-                        json=request_data
-                    )
-                    
-                    if response.status_code == 201:
-                        return {
-                            "success": True,
-                            "message": "Vacation request created successfully",
-                            "booking_id": response.json().get("id"),
-                            "employee_id": employee_id,
-                            "start_date": start_date,
-                            "end_date": end_date
-                        }
-                    else:
-                        return {"error": f"Failed to create vacation request: {response.text}"}
-                
-                else:
-                    return {"error": f"Unknown tool: {tool_name}"}
-                    
+            return await handler(parameters)
         except Exception as e:
             logger.error(f"Tool execution failed: {e}")
             return {"error": str(e)}
     
+    async def _get_vacation_balance(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle the hr_vacation_balance tool"""
+        employee_id = parameters["employee_id"]
+        cached = self._balance_cache.get(employee_id)
+        if cached is not None:
+            return cached
+        
+        generation = self._balance_generation.get(employee_id, 0)
+        response = await self.http_client.get(f"/api/vacations/{employee_id}")
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            result = {
+                "employee_id": employee_id,
+                "vacation_balance": data.get("balance", 0),
+                "total_days": data.get("total_days", 0),
+                "used_days": data.get("used_days", 0)
+            }
+            if self._balance_generation.get(employee_id, 0) == generation:
+                self._balance_cache[employee_id] = result
+            return result
+        else:
+            return {"error": f"Failed to get vacation balance: {response.text}"}
+    
+    async def _create_vacation_request(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle the hr_vacation_request tool"""
+        employee_id = parameters["employee_id"]
+        start_date = parameters["start_date"]
+        end_date = parameters["end_date"]
+        reason = parameters.get("reason", "Personal time off")
+        
+        request_data = {
+            "employee_id": employee_id,
+            "start_date": start_date,
+            "end_date": end_date,
+            "reason": reason,
+            "status": "approved"
+        }
+        
+        response = await self.http_client.post(
+            "/api/vacations",
+            content=orjson.dumps(request_data),
+            headers={"Content-Type": "application/json"}
+        )
+        
+        if response.status_code == 201:
+            self._balance_generation[employee_id] = self._balance_generation.get(employee_id, 0) + 1
+            self._balance_cache.pop(employee_id, None)
+            return {
+                "success": True,
+                "message": "Vacation request created successfully",
+                "booking_id": orjson.loads(response.content).get("id"),
+                "employee_id": employee_id,
+                "start_date": start_date,
+                "end_date": end_date
+            }
+        else:
+            return {"error": f"Failed to create vacation request: {response.text}"}
+    
+    async def _create_turn_stream(self, query: str):
+        """Start a streamed turn for a user query in the current session"""
+        # Retry initialization here if it failed at startup
+        if not self._ready.is_set():
+            await self.initialize_agent()
+        if not self.current_session:
+            await self.create_session()
+        
+        # Create turn with user message
+        messages = [
+            Message(
+                role=MessageRole.user,
+                content=query
+            )
+        ]
+        
+        # Stream the turn so tool calls start while the model is still generating
+        return await self.client.agents.create_turn(
+            agent_id=self.agent_id,
+            session_id=self.current_session,
+            request=AgentTurnCreateRequest(
+                messages=messages,
+                stream=True
+            )
+        )
+    
+    async def stream_query(self, query: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a user query, yielding events as they arrive
+        
+        Events are {"delta": text} for response text and {"tool_result": ...}
+        for each tool call, in call order, once its result is ready.
+        """
+        response = await self._create_turn_stream(query)
+        
+        pending_tool_calls = []
+        try:
+            async for chunk in response:
+                payload = getattr(getattr(chunk, 'event', None), 'payload', None)
+                if payload is None:
+                    continue
+                
+                tool_call = getattr(payload, 'tool_call', None)
+                if tool_call is not None:
+                    task = asyncio.create_task(
+                        self.execute_tool(tool_call.tool_name, tool_call.arguments)
+                    )
+                    pending_tool_calls.append((tool_call, task))
+                    continue
+                
+                text = getattr(getattr(payload, 'delta', None), 'text', None)
+                if text:
+                    yield {"delta": text}
+                
+                # Pass on results that finished while the turn was streaming
+                while pending_tool_calls and pending_tool_calls[0][1].done():
+                    tool_call, task = pending_tool_calls.pop(0)
+                    yield self._tool_result_event(tool_call, task.result())
+            
+            while pending_tool_calls:
+                tool_call, task = pending_tool_calls.pop(0)
+                yield self._tool_result_event(tool_call, await task)
+        finally:
+            # The consumer went away or the turn failed; stop tool calls
+            # that nobody will see the result of
+            for _, task in pending_tool_calls:
+                task.cancel()
+    
+    @staticmethod
+    def _tool_result_event(tool_call, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the stream_query event for a finished tool call"""
+        return {
+            "tool_result": {
+                "call_id": tool_call.call_id,
+                "tool_name": tool_call.tool_name,
+                "content": result,
+            }
+        }
+    
     async def process_query(self, query: str) -> str:
         """Process a user query using ReACT reasoning"""
         try:
-            if not self.current_session:
-                await self.create_session()
-            
-            # Create turn with user message
-            messages = [
-                Message(
-                    role=MessageRole.user,
-                    content=query
-                )
-            ]
+            # stream_query runs the tool calls and cancels any still pending if
+            # the turn fails; the response is the text it streams
+            parts = []
+            async with aclosing(self.stream_query(query)) as events:
+                async for event in events:
+                    if "delta" in event:
+                        parts.append(event["delta"])
             
-            response = await self.client.agents.create_turn(
-                agent_id=self.agent_id,
-                session_id=self.current_session,
-                request=AgentTurnCreateRequest(
-                    messages=messages,
-                    stream=False
-                )
-            )
-            
-            # Process the response and handle tool calls
-            result_messages = []
-            
-            for event in response.events:
-                if hasattr(event, 'payload'):
-                    if hasattr(event.payload, 'tool_call'):
-                        # Handle tool call
-                        tool_call = event.payload.tool_call
-                        tool_result = await self.execute_tool(
-                            tool_call.tool_name,
-                            tool_call.arguments
-                        )
-                        
-                        # Send tool result back
-                        tool_result_msg = ToolResultMessage(
-                            call_id=tool_call.call_id,
-                            tool_name=tool_call.tool_name,
-                            content=json.dumps(tool_result)
-                        )
-                        result_messages.append(tool_result_msg)
-                    
-                    elif hasattr(event.payload, 'message'):
-                        # Regular message
-                        result_messages.append(event.payload.message)
-            
-            # Return the final response
-            if result_messages:
-                return result_messages[-1].content if hasattr(result_messages[-1], 'content') else str(result_messages[-1])
-            else:
-                return "No response generated"
+            return "".join(parts) or "No response generated"
                 
         except Exception as e:
             logger.error(f"Query processing failed: {e}")
             return f"Error processing query: {str(e)}"
+    
+    async def aclose(self):
+        """Close the shared HR API client"""
+        await self.http_client.aclose()
 
 async def main():
     """Main function to demonstrate ReACT agent usage"""
@@ -289,6 +386,8 @@ async def main():
             
     except Exception as e:
         logger.error(f"Main execution failed: {e}")
+    finally:
+        await agent.aclose()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
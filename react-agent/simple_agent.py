@@ -7,10 +7,13 @@ updated to use the HR MCP server for vacation management.
 """
 
 import os
+import socket
 import uuid
 import logging
 
 import fire
+import httpx
+import orjson
 from llama_stack_client import LlamaStackClient
 from llama_stack_client.lib.agents.react.agent import ReActAgent
 from llama_stack_client.lib.agents.react.tool_parser import ReActOutput
@@ -18,9 +21,12 @@ from llama_stack_client.lib.agents.event_logger import EventLogger
 from termcolor import colored
 
 # Configure logging
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING").upper())
 logger = logging.getLogger(__name__)
 
+# ReAct response schema, generated once at import
+REACT_SCHEMA = ReActOutput.model_json_schema()
+
 
 def main(host: str = "llama-stack", port: int = 80):
     """
@@ -29,26 +35,45 @@ def main(host: str = "llama-stack", port: int = 80):
     Args:
         host: Llama Stack server host (default: llama-stack)
         port: Llama Stack server port (default: 80)
+
+    Set LLAMA_STACK_MODEL to skip the model discovery request.
     """
+    # Pooled keep-alive connections, reused across the prompt turns.
+    # The limits go on the transport; httpx ignores Client limits when an
+    # explicit transport is passed.
+    http_client = httpx.Client(
+        transport=httpx.HTTPTransport(
+            retries=2,
+            limits=httpx.Limits(max_keepalive_connections=32, keepalive_expiry=300),
+            # Larger receive buffer so each recv drains more of the event stream
+            socket_options=[(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)],
+        ),
+        timeout=httpx.Timeout(60.0, connect=5.0),
+    )
     client = LlamaStackClient(
-        base_url=f"http://{host}:{port}"
+        base_url=f"http://{host}:{port}",
+        http_client=http_client,
     )
 
-    # Get available models
-    available_models = [
-        model.identifier for model in client.models.list() if model.model_type == "llm"
-    ]
-    if not available_models:
-        print(colored("No available models. Exiting.", "red"))
-        return
-
-    selected_model = available_models[0]
+    # Use the configured model if set, otherwise pick the first available LLM
+    selected_model = os.environ.get("LLAMA_STACK_MODEL")
+    if selected_model:
+        logger.info("Using model from LLAMA_STACK_MODEL, skipping model discovery")
+    else:
+        available_models = [
+            model.identifier for model in client.models.list() if model.model_type == "llm"
+        ]
+        if not available_models:
+            print(colored("No available models. Exiting.", "red"))
+            return
+
+        selected_model = available_models[0]
+        logger.info("Discovered model from Llama Stack server")
     print(colored(f"Using model: {selected_model}", "green"))
 
     # Initialize ReActAgent with HR MCP server tools
     logger.info("Creating ReActAgent with response format schema...")
-    schema = ReActOutput.model_json_schema()
-    logger.debug(f"ReActOutput schema: {schema}")
+    logger.debug("ReActOutput schema: %s", REACT_SCHEMA)
     
     try:
         agent = ReActAgent(
@@ -59,7 +84,7 @@ def main(host: str = "llama-stack", port: int = 80):
             ],
             response_format={
                 "type": "json_schema",
-                "json_schema": schema,
+                "json_schema": REACT_SCHEMA,
             },
             sampling_params={
                 "strategy": {"type": "top_p", "temperature": 1.0, "top_p": 0.9},
@@ -67,13 +92,14 @@ def main(host: str = "llama-stack", port: int = 80):
         )
         logger.info("ReActAgent created successfully")
     except Exception as e:
-        logger.error(f"Failed to create ReActAgent: {e}")
+        logger.error("Failed to create ReActAgent: %s", e)
         raise
 
     # Create a session
     session_id = agent.create_session(f"hr-react-session-{uuid.uuid4().hex}")
 
-    # HR-focused user prompts
+    # HR-focused user prompts; they run in order in one session since later
+    # prompts depend on the balance the booking prompt changes
     user_prompts = [
         "What is the vacation balance for employee EMP001?",
         "If user EMP001 has enough remaining vacation days, book two days off for 2nd and 3rd of July 2025",
@@ -87,7 +113,7 @@ def main(host: str = "llama-stack", port: int = 80):
         print(colored("=" * 80, "yellow"))
         
         try:
-            logger.info(f"Creating turn for prompt: {prompt}")
+            logger.info("Creating turn for prompt: %s", prompt)
             response = agent.create_turn(
                 messages=[{"role": "user", "content": prompt}],
                 session_id=session_id,
@@ -99,28 +125,31 @@ def main(host: str = "llama-stack", port: int = 80):
             for log in EventLogger().log(response):
                 try:
                     # Log the raw event before printing
-                    logger.debug(f"Processing event: {type(log)} - {log}")
+                    logger.debug("Processing event: %s - %s", type(log), log)
                     log.print()
                 except Exception as log_error:
-                    logger.error(f"Error processing log event: {log_error}")
-                    logger.error(f"Raw log event: {log}")
+                    logger.error("Error processing log event: %s", log_error)
+                    logger.error("Raw log event: %s", log)
                     if hasattr(log, 'raw_content'):
-                        logger.error(f"Raw content: {log.raw_content}")
+                        logger.error("Raw content: %s", log.raw_content)
                     if hasattr(log, '_raw_message'):
-                        logger.error(f"Raw message: {log._raw_message}")
+                        logger.error("Raw message: %s", log._raw_message)
                     # Try to extract any JSON content for debugging
                     log_str = str(log)
-                    if '{' in log_str and '}' in log_str:
-                        start_idx = log_str.find('{')
-                        end_idx = log_str.rfind('}') + 1
+                    start_idx = log_str.find('{')
+                    end_idx = log_str.rfind('}') + 1
+                    if start_idx != -1 and end_idx > start_idx:
                         potential_json = log_str[start_idx:end_idx]
-                        logger.error(f"Potential JSON content: {potential_json}")
+                        try:
+                            logger.error("Parsed JSON content: %s", orjson.loads(potential_json))
+                        except orjson.JSONDecodeError:
+                            logger.error("Potential JSON content: %s", potential_json)
             
         except Exception as e:
-            logger.error(f"Error in turn processing: {e}")
-            logger.error(f"Error type: {type(e)}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.error("Error in turn processing: %s", e)
+            logger.error("Error type: %s", type(e))
+            # exc_info lets logging format the traceback only if the record is emitted
+            logger.error("Traceback:", exc_info=True)
         
         print(colored("\n" + "=" * 80 + "\n", "yellow"))
 
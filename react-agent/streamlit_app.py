@@ -7,16 +7,20 @@ to demonstrate intelligent reasoning and tool usage for HR operations.
 """
 
 import streamlit as st
-import uuid
-import io
-import sys
-from contextlib import redirect_stdout, redirect_stderr
+import collections
+import os
+import queue
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 import traceback
+from typing import Optional
 
+import httpx
 from llama_stack_client import LlamaStackClient
 from llama_stack_client.lib.agents.react.agent import ReActAgent
 from llama_stack_client.lib.agents.react.tool_parser import ReActOutput
-from llama_stack_client.lib.agents.event_logger import EventLogger
 
 
 # Page configuration
@@ -27,46 +31,48 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for better styling
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        color: #2E86AB;
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-    .reasoning-box {
-        background-color: #FFF3E0;
-        border-left: 4px solid #FF9800;
-        padding: 1rem;
-        margin: 1rem 0;
-        border-radius: 0.5rem;
-    }
-    .tool-box {
-        background-color: #E8F5E8;
-        border-left: 4px solid #4CAF50;
-        padding: 1rem;
-        margin: 1rem 0;
-        border-radius: 0.5rem;
-    }
-    .result-box {
-        background-color: #E3F2FD;
-        border-left: 4px solid #2196F3;
-        padding: 1rem;
-        margin: 1rem 0;
-        border-radius: 0.5rem;
-    }
-    .stButton > button {
-        background-color: #2E86AB;
-        color: white;
-        border-radius: 0.5rem;
-        border: none;
-        padding: 0.5rem 1rem;
-        font-weight: 600;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS for better styling, kept in a static file next to this script
+STYLES_PATH = Path(__file__).with_name("styles.css")
+
+
+@st.cache_data
+def load_css() -> str:
+    """Read the stylesheet once per process and wrap it in a style tag"""
+    return f"<style>\n{STYLES_PATH.read_text()}</style>"
+
+# Final answer card; filled in with str.format
+FINAL_ANSWER_TEMPLATE = """
+        <div style="background-color: #E8F5E8; border: 2px solid #4CAF50; padding: 1.5rem; margin: 1rem 0; border-radius: 0.5rem; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+            <h3 style="color: #2E7D32; margin-top: 0;">🎯 Final Answer</h3>
+            <p style="font-size: 1.1rem; margin-bottom: 0; color: #1B5E20;"><strong>{}</strong></p>
+        </div>
+        """
+
+
+# Minimum seconds between progressive redraws of a streaming response
+STREAM_FLUSH_INTERVAL = 0.05
+
+# Seconds to wait for streamed text before checking that the turn is still running
+STREAM_POLL_INTERVAL = 1.0
+
+# Agent turns that can run at once across all sessions; more wait for a thread
+MAX_CONCURRENT_TURNS = int(os.getenv("MAX_CONCURRENT_TURNS", "32"))
+
+# Lines that likely carry the agent's answer, the prefixes to strip from them,
+# and markers of intermediate reasoning that disqualify a candidate answer
+ANSWER_PATTERN_RE = re.compile(
+    r"final answer:|answer:|result:|the vacation balance|balance for|remaining",
+    re.IGNORECASE,
+)
+# Checked in this order; the first one found on the line wins
+ANSWER_PREFIXES = ("Final Answer:", "Answer:", "Result:", "final answer:", "answer:", "result:")
+REASONING_MARKER_RE = re.compile(r"thought:|action:|observation:", re.IGNORECASE)
+
+# JSON schema constraining the agent's ReAct output; computed once at import
+REACT_SCHEMA = ReActOutput.model_json_schema()
+
+# Most chat messages kept per session; older ones are dropped first
+MAX_HISTORY = int(os.getenv("MAX_HISTORY", "50"))
 
 
 def initialize_session_state():
@@ -76,21 +82,42 @@ def initialize_session_state():
     if 'session_id' not in st.session_state:
         st.session_state.session_id = None
     if 'messages' not in st.session_state:
-        st.session_state.messages = []
+        st.session_state.messages = collections.deque(maxlen=MAX_HISTORY)
     if 'client_connected' not in st.session_state:
         st.session_state.client_connected = False
 
 
+@st.cache_resource
+def get_client(host: str, port: int) -> LlamaStackClient:
+    """Create one Llama Stack client per server, shared across reruns and sessions"""
+    # Pooled keep-alive connections so concurrent sessions reuse sockets;
+    # no read timeout, since a streamed turn stays open while the agent works.
+    # The pool limits go on the transport; httpx ignores Client limits when
+    # an explicit transport is passed.
+    http_client = httpx.Client(
+        transport=httpx.HTTPTransport(
+            retries=1,
+            limits=httpx.Limits(max_keepalive_connections=64, max_connections=128),
+        ),
+        timeout=httpx.Timeout(5.0, read=None),
+    )
+    return LlamaStackClient(base_url=f"http://{host}:{port}", http_client=http_client)
+
+
+@st.cache_data(ttl=60)
+def list_llm_models(host: str, port: int) -> list[str]:
+    """List the LLM identifiers available on a Llama Stack server"""
+    return [
+        model.identifier for model in get_client(host, port).models.list() if model.model_type == "llm"
+    ]
+
+
 def connect_to_llama_stack(host: str, port: int):
     """Connect to Llama Stack and initialize ReACT agent"""
     try:
-        # Create client
-        client = LlamaStackClient(base_url=f"http://{host}:{port}")
-        
-        # Get available models
-        available_models = [
-            model.identifier for model in client.models.list() if model.model_type == "llm"
-        ]
+        # Reuse the cached client and model list for this server
+        client = get_client(host, port)
+        available_models = list_llm_models(host, port)
         
         if not available_models:
             st.error("❌ No available models found on Llama Stack server")
@@ -108,7 +135,7 @@ def connect_to_llama_stack(host: str, port: int):
             ],
             response_format={
                 "type": "json_schema",
-                "json_schema": ReActOutput.model_json_schema(),
+                "json_schema": REACT_SCHEMA,
             },
             sampling_params={
                 "strategy": {"type": "top_p", "temperature": 1.0, "top_p": 0.9},
@@ -131,6 +158,37 @@ def connect_to_llama_stack(host: str, port: int):
         return False
 
 
+@st.cache_resource
+def get_turn_executor() -> ThreadPoolExecutor:
+    """Worker threads for agent turns, shared by every session in the process"""
+    return ThreadPoolExecutor(max_workers=MAX_CONCURRENT_TURNS, thread_name_prefix="agent-turn")
+
+
+def run_turn(agent, session_id: str, query: str, events: queue.Queue):
+    """Run one agent turn, pushing streamed text into events until a None sentinel"""
+    try:
+        response = agent.create_turn(
+            messages=[{"role": "user", "content": query}],
+            session_id=session_id,
+            stream=True,
+        )
+        
+        for chunk in response:
+            # Extract text from TextDelta if available
+            payload = getattr(getattr(chunk, 'event', None), 'payload', None)
+            text = getattr(getattr(payload, 'delta', None), 'text', None)
+            if text:
+                events.put(text)
+    finally:
+        events.put(None)
+
+
+def render_agent_response(placeholder, content: str):
+    """Render the agent response into a placeholder as a single markdown element"""
+    fence = "~~~~" if "```" in content else "```"
+    placeholder.markdown(f"### Agent Response:\n{fence}json\n{content}\n{fence}")
+
+
 def process_query_realtime(query: str):
     print(query)
     """Process a query using the ReACT agent with real-time display"""
@@ -145,83 +203,143 @@ def process_query_realtime(query: str):
         
         status_container.info("🤔 Agent is processing your query...")
         
-        # Get the response stream
-        response = st.session_state.agent.create_turn(
-            messages=[{"role": "user", "content": query}],
-            session_id=st.session_state.session_id,
-            stream=True,
+        # Run the turn on a shared worker thread; this thread only consumes the
+        # streamed text as it arrives
+        events = queue.Queue()
+        future = get_turn_executor().submit(
+            run_turn, st.session_state.agent, st.session_state.session_id, query, events
         )
         
-        # Extract and collect all text content from the stream
-        all_content = ""
+        # Render the response progressively, at most every STREAM_FLUSH_INTERVAL
+        # seconds, so the user sees output from the first token on
+        response_placeholder = response_container.empty()
+        parts = []
+        last_flush = 0.0
         
-        for chunk in response:
-            # Extract text from TextDelta if available
-            if hasattr(chunk, 'event') and hasattr(chunk.event, 'payload'):
-                payload = chunk.event.payload
-                if hasattr(payload, 'delta') and hasattr(payload.delta, 'text'):
-                    all_content += payload.delta.text
+        while True:
+            try:
+                text = events.get(timeout=STREAM_POLL_INTERVAL)
+            except queue.Empty:
+                # run_turn queues the sentinel before it returns, so a finished
+                # turn with nothing queued never got to run
+                if future.done() and events.empty():
+                    break
+                continue
+            if text is None:
+                break
+            parts.append(text)
+            now = time.monotonic()
+            if now - last_flush >= STREAM_FLUSH_INTERVAL:
+                render_agent_response(response_placeholder, "".join(parts))
+                last_flush = now
         
-        # Display the complete response once
-        status_container.success("✅ Response complete!")
+        # Surface any error raised while streaming
+        future.result()
         
-        with response_container:
-            st.markdown("### Agent Response:")
-            st.code(all_content, language="json")
+        all_content = "".join(parts)
+        render_agent_response(response_placeholder, all_content)
+        status_container.success("✅ Response complete!")
         
         return all_content
         
     except Exception as e:
         st.error(f"❌ Error processing query: {str(e)}")
-        st.error(f"Full error: {traceback.format_exc()}")
+        if os.getenv("DEBUG"):
+            st.error(f"Full error: {traceback.format_exc()}")
         return None
 
 
-def format_agent_output(output: str):
-    """Format the agent output with better styling, separating answer from reasoning"""
-    if not output:
-        return
-    
-    import re
-    
+def extract_final_answer(output: str) -> Optional[str]:
+    """Find the final answer in the agent output"""
     final_answer = None
     
     # Look for final answer patterns in the output
-    lines = output.split('\n')
-    for line in lines:
+    for line in output.splitlines():
         line = line.strip()
-        if not line:
+        if not line or not ANSWER_PATTERN_RE.search(line):
             continue
-            
-        # Look for final answer patterns
-        if any(pattern in line.lower() for pattern in ["final answer:", "answer:", "result:", "the vacation balance", "balance for", "remaining"]):
-            # Extract the answer content after common prefixes
-            answer_content = line
-            for prefix in ["Final Answer:", "Answer:", "Result:", "final answer:", "answer:", "result:"]:
-                if prefix in line:
-                    answer_content = line.split(prefix, 1)[-1].strip()
-                    break
-            if answer_content and not any(word in answer_content.lower() for word in ["thought:", "action:", "observation:"]):
-                final_answer = answer_content
+        
+        # Extract the answer content after common prefixes
+        answer_content = line
+        for prefix in ANSWER_PREFIXES:
+            if prefix in line:
+                answer_content = line.partition(prefix)[2].strip()
+                break
+        if answer_content and not REASONING_MARKER_RE.search(answer_content):
+            final_answer = answer_content
+    
+    return final_answer
+
+
+def format_agent_output(message: dict):
+    """Render an agent message record, separating answer from reasoning"""
+    output = message["content"]
+    if not output:
+        return
+    
+    # Parsed once when the message was recorded, not on every rerun
+    final_answer = message.get("final_answer")
     
     # Display final answer prominently if found
     if final_answer:
-        st.markdown("""
-        <div style="background-color: #E8F5E8; border: 2px solid #4CAF50; padding: 1.5rem; margin: 1rem 0; border-radius: 0.5rem; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-            <h3 style="color: #2E7D32; margin-top: 0;">🎯 Final Answer</h3>
-            <p style="font-size: 1.1rem; margin-bottom: 0; color: #1B5E20;"><strong>{}</strong></p>
-        </div>
-        """.format(final_answer), unsafe_allow_html=True)
+        st.markdown(FINAL_ANSWER_TEMPLATE.format(final_answer), unsafe_allow_html=True)
     
     # Show raw response in expandable section
     with st.expander("🔍 View Reasoning Steps", expanded=False):
         st.text(output)
 
 
+@st.fragment
+def chat_panel():
+    """Chat history, query input and the live turn; sending a query reruns only this"""
+    for message in st.session_state.messages:
+        if message["role"] == "agent":
+            with st.chat_message("assistant"):
+                format_agent_output(message)
+        else:
+            with st.chat_message("user"):
+                st.markdown(message["content"])
+    
+    # Query input; an example picked in the sidebar is sent as the query
+    query = st.chat_input(
+        "Ask me about vacation management for employees...",
+        disabled=not st.session_state.client_connected,
+    ) or st.session_state.pop('current_query', None)
+    
+    if query:
+        # Add user message to chat history
+        st.session_state.messages.append({"role": "user", "content": query})
+        with st.chat_message("user"):
+            st.markdown(query)
+        
+        # Process the query with real-time display
+        with st.chat_message("assistant"):
+            agent_output = process_query_realtime(query)
+        
+        if agent_output:
+            # Add agent response to chat history, parsed once up front
+            st.session_state.messages.append({
+                "role": "agent",
+                "content": agent_output,
+                "final_answer": extract_final_answer(agent_output),
+            })
+    
+    if st.session_state.messages:
+        st.divider()
+        
+        # Clear history button
+        if st.button("🗑️ Clear History"):
+            st.session_state.messages.clear()
+            st.rerun(scope="fragment")
+
+
 def main():
     """Main Streamlit application"""
     initialize_session_state()
     
+    # Styles have to be re-emitted on every rerun or Streamlit drops them
+    st.markdown(load_css(), unsafe_allow_html=True)
+    
     # Header
     st.markdown('<h1 class="main-header">🤖 HR ReACT Agent</h1>', unsafe_allow_html=True)
     st.markdown("**Intelligent HR Operations with Reasoning & Acting**")
@@ -268,32 +386,7 @@ def main():
     with col1:
         st.subheader("💬 Chat with the Agent")
         
-        # Query input
-        query = st.text_area(
-            "Enter your HR query:",
-            value=st.session_state.get('current_query', ''),
-            height=100,
-            placeholder="Ask me about vacation management for employees..."
-        )
-        
-        # Process button
-        if st.button("🚀 Send Query", disabled=not st.session_state.client_connected):
-            if query.strip():
-                # Add user message to chat history
-                st.session_state.messages.append({"role": "user", "content": query})
-                
-                # Process the query with real-time display
-                agent_output = process_query_realtime(query)
-                
-                if agent_output:
-                    # Add agent response to chat history
-                    st.session_state.messages.append({"role": "agent", "content": agent_output})
-                
-                # Clear the current query
-                if 'current_query' in st.session_state:
-                    del st.session_state.current_query
-            else:
-                st.warning("Please enter a query!")
+        chat_panel()
     
     with col2:
         st.subheader("ℹ️ About ReACT")
@@ -311,16 +404,6 @@ def main():
         st.write("• HR Vacation Balance Check")
         st.write("• Vacation Request Creation")
         st.write("• Employee Data Access")
-    
-    # Chat history
-    if st.session_state.messages:
-        st.divider()
-   
-        
-        # Clear history button
-        if st.button("🗑️ Clear History"):
-            st.session_state.messages = []
-            st.rerun()
 
 
 if __name__ == "__main__":
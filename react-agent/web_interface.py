@@ -8,12 +8,15 @@ for HR operations and vacation management.
 
 import asyncio
 import logging
+import os
 from typing import Optional
-from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
+import orjson
 import uvicorn
+from pydantic import BaseModel
 
 from agent import HRReActAgent
 
@@ -21,8 +24,37 @@ from agent import HRReActAgent
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Example queries for testing, serialized once since they never change
+EXAMPLES = [
+    {
+        "title": "Check Vacation Balance",
+        "query": "What is the vacation balance for employee EMP001?",
+        "description": "Simple query to check how many vacation days an employee has remaining"
+    },
+    {
+        "title": "Conditional Vacation Booking",
+        "query": "If user EMP001 has enough remaining vacation days, book two days off for 2nd and 3rd of July 2025",
+        "description": "Complex conditional logic - check balance first, then book if sufficient days available"
+    },
+    {
+        "title": "Multi-step Reasoning",
+        "query": "Check if EMP001 has any vacation days left, and if so, suggest when they might want to use them based on their remaining balance",
+        "description": "Demonstrates ReACT reasoning with analysis and recommendations"
+    },
+    {
+        "title": "Vacation Request with Analysis",
+        "query": "I want to book vacation for EMP001 from July 15-20, 2025. Check if they have enough days and book it if possible.",
+        "description": "Date range booking with automatic balance checking"
+    }
+]
+EXAMPLES_JSON = orjson.dumps({"examples": EXAMPLES})
+
 # Initialize FastAPI app
-app = FastAPI(title="ReACT Agent Interface", description="HR Operations with ReACT Agent")
+app = FastAPI(
+    title="ReACT Agent Interface",
+    description="HR Operations with ReACT Agent",
+    default_response_class=ORJSONResponse
+)
 
 # Initialize templates
 templates = Jinja2Templates(directory="templates")
@@ -34,74 +66,98 @@ react_agent: Optional[HRReActAgent] = None
 async def startup_event():
     """Initialize the ReACT agent on startup"""
     global react_agent
+    react_agent = HRReActAgent()
+    # uvicorn finishes startup before accepting connections, so the agent is
+    # normally ready for the first request; on failure queries retry the init
     try:
-        react_agent = HRReActAgent()
         await react_agent.initialize_agent()
         logger.info("ReACT Agent initialized successfully")
     except Exception as e:
-        logger.error(f"Failed to initialize ReACT Agent: {e}")
+        logger.error(f"Failed to initialize ReACT Agent, will retry on first query: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the ReACT agent's HTTP connections on shutdown"""
+    if react_agent:
+        await react_agent.aclose()
 
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
     """Main interface page"""
     return templates.TemplateResponse("index.html", {"request": request})
 
-@app.post("/query")
-async def process_query(query: str = Form(...)):
+class QueryIn(BaseModel):
+    """Request body for /query"""
+    query: str
+
+@app.post("/query", response_class=ORJSONResponse)
+async def process_query(body: QueryIn):
     """Process a query through the ReACT agent"""
     if not react_agent:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"error": "ReACT Agent not initialized"}
         )
     
     try:
-        response = await react_agent.process_query(query)
-        return JSONResponse(content={"response": response})
+        response = await react_agent.process_query(body.query)
+        return ORJSONResponse(content={"response": response})
     except Exception as e:
         logger.error(f"Query processing failed: {e}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"error": f"Failed to process query: {str(e)}"}
         )
 
+async def stream_agent_events(query: str):
+    """Yield the agent's response deltas and tool results as server-sent events"""
+    try:
+        async for event in react_agent.stream_query(query):
+            yield f"data: {orjson.dumps(event).decode()}\n\n"
+    except Exception as e:
+        logger.error(f"Query streaming failed: {e}")
+        yield f"data: {orjson.dumps({'error': f'Failed to process query: {str(e)}'}).decode()}\n\n"
+    yield "data: [DONE]\n\n"
+
+@app.post("/query/stream")
+async def stream_query(body: QueryIn):
+    """Stream a query's response through the ReACT agent as server-sent events"""
+    if not react_agent:
+        return ORJSONResponse(
+            status_code=500,
+            content={"error": "ReACT Agent not initialized"}
+        )
+    
+    return StreamingResponse(
+        stream_agent_events(body.query),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "agent_initialized": react_agent is not None}
+    return {"status": "healthy", "agent_initialized": react_agent is not None and react_agent.ready}
 
 @app.get("/examples")
+@app.head("/examples")
 async def get_examples():
     """Get example queries for testing"""
-    examples = [
-        {
-            "title": "Check Vacation Balance",
-            "query": "What is the vacation balance for employee EMP001?",
-            "description": "Simple query to check how many vacation days an employee has remaining"
-        },
-        {
-            "title": "Conditional Vacation Booking",
-            "query": "If user EMP001 has enough remaining vacation days, book two days off for 2nd and 3rd of July 2025",
-            "description": "Complex conditional logic - check balance first, then book if sufficient days available"
-        },
-        {
-            "title": "Multi-step Reasoning",
-            "query": "Check if EMP001 has any vacation days left, and if so, suggest when they might want to use them based on their remaining balance",
-            "description": "Demonstrates ReACT reasoning with analysis and recommendations"
-        },
-        {
-            "title": "Vacation Request with Analysis",
-            "query": "I want to book vacation for EMP001 from July 15-20, 2025. Check if they have enough days and book it if possible.",
-            "description": "Date range booking with automatic balance checking"
-        }
-    ]
-    return JSONResponse(content={"examples": examples})
+    return Response(content=EXAMPLES_JSON, media_type="application/json")
 
 if __name__ == "__main__":
+    # uvicorn picks uvloop and httptools itself when they are installed. Each
+    # worker process has its own agent and balance cache, so with WEB_WORKERS
+    # above 1 a booking only clears the cache in the worker that made it and
+    # the others may report the old balance for up to 30 seconds. Auto-reload
+    # is only for development (DEV=1) and cannot be combined with workers.
+    dev_mode = bool(os.getenv("DEV"))
     uvicorn.run(
         "web_interface:app",
         host="0.0.0.0",
         port=8080,
-        reload=True,
+        reload=dev_mode,
+        workers=1 if dev_mode else int(os.getenv("WEB_WORKERS", "1")),
+        lifespan="on",
         log_level="info"
-    )
\ No newline at end of file
+    )